@@ -1,382 +1,537 @@
-import streamlit as st
-import pandas as pd
-import io
-
-# --- PAGE CONFIGURATION ---
-st.set_page_config(
-    page_title="Prabal Ecommerce Analyzer",
-    page_icon="🛒",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
-# --- CUSTOM CSS ---
-st.markdown("""
-    <style>
-    .main { background-color: #f8f9fa; }
-    .stMetric { background-color: white; padding: 15px; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.05); }
-    h1, h2, h3 { color: #232f3e; font-family: 'Helvetica Neue', Helvetica, Arial, sans-serif; }
-    </style>
-    """, unsafe_allow_html=True)
-
-# --- HELPER FUNCTIONS ---
-
-def normalize_match_type(val):
-    if pd.isna(val): return 'UNKNOWN'
-    val = str(val).upper()
-    if 'EXACT' in val: return 'EXACT'
-    if 'PHRASE' in val: return 'PHRASE'
-    if 'BROAD' in val: return 'BROAD'
-    return 'AUTO/OTHER'
-
-def determine_winner(group, improvement_thresh, min_orders):
-    max_sales_idx = group['sales_val'].idxmax()
-    sales_leader = group.loc[max_sales_idx]
-    
-    max_roas_idx = group['calculated_roas'].idxmax()
-    roas_leader = group.loc[max_roas_idx]
-    
-    if max_sales_idx == max_roas_idx:
-        return max_sales_idx, "Best Sales & ROAS"
-    
-    roas_sales = sales_leader['calculated_roas']
-    roas_challenger = roas_leader['calculated_roas']
-    
-    improvement = (roas_challenger - roas_sales) / roas_sales if roas_sales > 0 else 999
-    
-    if (improvement >= (improvement_thresh / 100.0)) and (roas_leader['orders_val'] >= min_orders):
-        return max_roas_idx, f"Efficient (ROAS +{improvement:.0%})"
-    else:
-        return max_sales_idx, "Volume Leader"
-
-def generate_ngrams(text, n):
-    words = str(text).lower().split()
-    if len(words) < n:
-        return []
-    return [' '.join(words[i:i+n]) for i in range(len(words)-n+1)]
-
-def process_ngrams(df, n_value):
-    ngram_data = []
-    for _, row in df.iterrows():
-        term = row['Search Term']
-        grams = generate_ngrams(term, n_value)
-        for gram in grams:
-            ngram_data.append({
-                'N-Gram': gram,
-                'Spend': row['Spend'],
-                'Sales': row['Sales'],
-                'Orders': row['Orders'],
-                'Clicks': row['Clicks']
-            })
-            
-    if not ngram_data:
-        return pd.DataFrame()
-        
-    ng_df = pd.DataFrame(ngram_data)
-    ng_agg = ng_df.groupby('N-Gram', as_index=False).sum()
-    
-    # Calculate Metrics
-    ng_agg['ROAS'] = ng_agg.apply(lambda x: x['Sales']/x['Spend'] if x['Spend'] > 0 else 0, axis=1)
-    ng_agg['CPC'] = ng_agg.apply(lambda x: x['Spend']/x['Clicks'] if x['Clicks'] > 0 else 0, axis=1)
-    ng_agg['ACOS'] = ng_agg.apply(lambda x: (x['Spend']/x['Sales'])*100 if x['Sales'] > 0 else 0, axis=1)
-    ng_agg['Count'] = ng_df.groupby('N-Gram').size().values 
-    
-    return ng_agg.sort_values(by='Spend', ascending=False)
-
-def to_excel(dfs):
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        for sheet_name, df in dfs.items():
-            if not df.empty:
-                df.to_excel(writer, sheet_name=sheet_name[:31], index=False) 
-    return output.getvalue()
-
-# --- MAIN APP ---
-
-def main():
-    with st.sidebar:
-        st.title("🛒 Prabal Ecommerce Analyzer")
-        st.markdown("---")
-        
-        # 1. File Upload
-        st.subheader("1. Data Source")
-        uploaded_file = st.file_uploader("Upload Search Term Report", type=["csv", "xlsx"])
-        
-        df = None
-        
-        # 2. Portfolio Filter
-        if uploaded_file:
-            try:
-                if uploaded_file.name.endswith('.csv'):
-                    df_raw = pd.read_csv(uploaded_file)
-                else:
-                    df_raw = pd.read_excel(uploaded_file)
-                
-                df_raw.columns = df_raw.columns.str.strip()
-                
-                port_col = next((c for c in df_raw.columns if 'Portfolio' in c), None)
-                
-                if port_col:
-                    st.subheader("2. Filter Data")
-                    all_portfolios = df_raw[port_col].dropna().unique().tolist()
-                    selected_ports = st.multiselect("Select Portfolios", options=all_portfolios, default=all_portfolios)
-                    
-                    if selected_ports:
-                        df = df_raw[df_raw[port_col].isin(selected_ports)].copy()
-                    else:
-                        df = df_raw.copy()
-                else:
-                    df = df_raw.copy()
-                    st.info("No 'Portfolio' column found. Showing all data.")
-
-            except Exception as e:
-                st.error(f"Error reading file: {e}")
-        
-        # 3. Settings
-        if df is not None:
-            st.markdown("---")
-            st.subheader("3. Analysis Thresholds")
-            
-            with st.expander("⚔️ Cannibalization Rules", expanded=False):
-                roas_threshold = st.slider("Better ROAS Threshold (%)", 30, 200, 100, 10)
-                min_orders_cannibal = st.number_input("Min Orders to Win", 1, 10, 2)
-                
-            with st.expander("🌾 Harvesting Rules", expanded=True):
-                min_orders_harvest = st.number_input("Min Orders", 1, 10, 2, help="Strictly > 1 means set this to 2")
-                min_roas_harvest = st.number_input("Min ROAS", 0.1, 10.0, 1.0, 0.1)
-                
-            with st.expander("💰 CPC Analyzer", expanded=False):
-                top_n_terms = st.slider("Analyze Top N Terms", 10, 100, 50)
-                bad_roas_limit = st.number_input("Low ROAS Flag (<)", 0.1, 5.0, 1.0, 0.1)
-
-    # --- MAIN CONTENT ---
-    if df is not None:
-        try:
-            # Column Mapping
-            col_map = {
-                'date': next((c for c in df.columns if 'Date' in c), None),
-                'term': next((c for c in df.columns if 'Matched product' in c or 'Customer Search Term' in c), None),
-                'camp': next((c for c in df.columns if 'Campaign Name' in c), None),
-                'adg': next((c for c in df.columns if 'Ad Group Name' in c), None),
-                'match': next((c for c in df.columns if 'Match Type' in c), None),
-                'orders': next((c for c in df.columns if 'Orders' in c or 'Units' in c), None),
-                'sales': next((c for c in df.columns if 'Sales' in c), None),
-                'spend': next((c for c in df.columns if 'Spend' in c), None),
-                'clicks': next((c for c in df.columns if 'Clicks' in c), None),
-                'impressions': next((c for c in df.columns if 'Impressions' in c), None)
-            }
-
-            if any(v is None for v in ['term', 'camp', 'adg', 'spend', 'sales']):
-                st.error(f"Missing essential columns. Please check your file headers. Found: {col_map}")
-            else:
-                # Cleanup Numeric
-                num_cols = ['orders', 'sales', 'spend', 'clicks', 'impressions']
-                for c in num_cols:
-                    if col_map[c]:
-                        df[col_map[c]] = pd.to_numeric(df[col_map[c]], errors='coerce').fillna(0)
-                
-                df['norm_match'] = df[col_map['match']].apply(normalize_match_type)
-                if col_map['date']:
-                    df['Date'] = pd.to_datetime(df[col_map['date']], errors='coerce')
-                    df['DayOfWeek'] = df['Date'].dt.day_name()
-
-                # --- AGGREGATION ---
-                agg_cols = [col_map['term'], col_map['camp'], col_map['adg'], 'norm_match']
-                df_agg = df.groupby(agg_cols, as_index=False).agg({
-                    col_map['spend']: 'sum',
-                    col_map['sales']: 'sum',
-                    col_map['orders']: 'sum',
-                    col_map['clicks']: 'sum',
-                    col_map['impressions']: 'sum'
-                })
-                
-                df_agg.rename(columns={
-                    col_map['term']: 'Search Term',
-                    col_map['camp']: 'Campaign',
-                    col_map['adg']: 'Ad Group',
-                    col_map['orders']: 'Orders',
-                    col_map['sales']: 'Sales',
-                    col_map['spend']: 'Spend',
-                    col_map['clicks']: 'Clicks',
-                    col_map['impressions']: 'Impressions'
-                }, inplace=True)
-                
-                df_agg['ROAS'] = df_agg.apply(lambda x: x['Sales']/x['Spend'] if x['Spend'] > 0 else 0, axis=1)
-                df_agg['CPC'] = df_agg.apply(lambda x: x['Spend']/x['Clicks'] if x['Clicks'] > 0 else 0, axis=1)
-                df_agg['ACOS'] = df_agg.apply(lambda x: (x['Spend']/x['Sales'])*100 if x['Sales'] > 0 else 0, axis=1)
-
-                # Rounding 1 Decimal
-                for col in ['Spend', 'Sales', 'ROAS', 'CPC', 'ACOS']:
-                    df_agg[col] = df_agg[col].round(1)
-
-                existing_exact = set(df_agg[df_agg['norm_match'] == 'EXACT']['Search Term'].str.lower().unique())
-
-                # --- HEADER ---
-                st.title("Prabal Ecommerce Analyzer")
-                st.markdown(f"**Analyzing File:** `{uploaded_file.name}`")
-                
-                c1, c2, c3, c4 = st.columns(4)
-                c1.metric("Total Spend", f"₹{df_agg['Spend'].sum():,.1f}")
-                c2.metric("Total Sales", f"₹{df_agg['Sales'].sum():,.1f}")
-                
-                total_spend = df_agg['Spend'].sum()
-                total_sales = df_agg['Sales'].sum()
-                account_roas = total_sales / total_spend if total_spend > 0 else 0
-                c3.metric("Account ROAS", f"{account_roas:.1f}")
-                c4.metric("Unique Search Terms", f"{df_agg['Search Term'].nunique():,}")
-
-                # --- TABS ---
-                tabs = st.tabs(["⚔️ Cannibalization", "🌾 Harvesting", "💰 CPC Analyzer", "📅 Best Days", "💸 Wasted Spend", "🔠 N-Gram Analysis"])
-
-                # TAB 1: CANNIBALIZATION
-                with tabs[0]:
-                    st.subheader("Detect & Fix Self-Competition")
-                    sales_df = df_agg[df_agg['Orders'] > 0].copy()
-                    dupe_counts = sales_df.groupby('Search Term').size()
-                    cannibal_list = dupe_counts[dupe_counts > 1].index.tolist()
-                    
-                    st.info(f"**Common Search Terms Found:** {len(cannibal_list)} (Terms appearing in >1 Ad Group with Sales)")
-
-                    cannibal_results = []
-                    if cannibal_list:
-                        for term in cannibal_list:
-                            subset = sales_df[sales_df['Search Term'] == term].rename(columns={'Sales': 'sales_val', 'Spend': 'spend_val', 'ROAS': 'calculated_roas', 'Orders': 'orders_val'}).copy()
-                            win_idx, _ = determine_winner(subset, roas_threshold, min_orders_cannibal) 
-                            for idx, row in subset.iterrows():
-                                is_winner = (idx == win_idx)
-                                cannibal_results.append({
-                                    'Search Term': term, 'Campaign': row['Campaign'], 'Ad Group': row['Ad Group'],
-                                    'CPC': row['CPC'], 'Spend': row['spend_val'], 'Sales': row['sales_val'], 
-                                    'Orders': row['orders_val'], 'ROAS': row['calculated_roas'], 
-                                    'Action': "✅ KEEP" if is_winner else "⛔ NEGATE"
-                                })
-                        
-                        df_cannibal = pd.DataFrame(cannibal_results)
-                        for c in ['Spend', 'Sales', 'ROAS', 'CPC']: df_cannibal[c] = df_cannibal[c].round(1)
-                        st.dataframe(df_cannibal.style.apply(lambda x: ['background-color: #ffebee' if 'NEGATE' in str(v) else '' for v in x], axis=1), use_container_width=True)
-                    else:
-                        st.success("No cannibalization found.")
-                        df_cannibal = pd.DataFrame()
-
-                # TAB 2: HARVESTING
-                with tabs[1]:
-                    st.subheader("Strict Growth Opportunities")
-                    st.caption(f"Criteria: Orders >= {min_orders_harvest} AND ROAS >= {min_roas_harvest}")
-                    candidates = df_agg[(df_agg['norm_match'] != 'EXACT') & (df_agg['Orders'] >= min_orders_harvest) & (df_agg['ROAS'] >= min_roas_harvest)].copy()
-                    
-                    harvest_results = []
-                    for idx, row in candidates.iterrows():
-                        if row['Search Term'].lower() not in existing_exact:
-                            harvest_results.append({
-                                'Search Term': row['Search Term'], 'Rec Type': '🚀 NEW EXACT', 
-                                'Source Campaign': row['Campaign'], 'Source Ad Group': row['Ad Group'],
-                                'Orders': row['Orders'], 'Sales': row['Sales'], 'ROAS': row['ROAS'], 'CPC': row['CPC']
-                            })
-                    
-                    df_harvest = pd.DataFrame(harvest_results)
-                    if not df_harvest.empty:
-                        for c in ['Sales', 'ROAS', 'CPC']: df_harvest[c] = df_harvest[c].round(1)
-                        st.dataframe(df_harvest.sort_values(by='Sales', ascending=False), use_container_width=True)
-                    else:
-                        st.info("No terms met criteria.")
-                        df_harvest = pd.DataFrame()
-
-                # TAB 3: CPC ANALYZER
-                with tabs[2]:
-                    st.subheader(f"Top {top_n_terms} Terms: CPC & Performance")
-                    top_terms = df_agg.groupby('Search Term')['Spend'].sum().nlargest(top_n_terms).index.tolist()
-                    df_top = df_agg[df_agg['Search Term'].isin(top_terms)].copy()
-                    
-                    cpc_results = []
-                    for term in top_terms:
-                        subset = df_top[df_top['Search Term'] == term]
-                        avg_cpc = subset['CPC'].mean()
-                        for idx, row in subset.iterrows():
-                            rec = "✅ Healthy"
-                            if row['ROAS'] < bad_roas_limit: rec = "⚠️ Low ROAS"
-                            elif row['CPC'] > (avg_cpc * 1.3): rec = "⚠️ High CPC"
-                            cpc_results.append({
-                                'Search Term': term, 'Campaign': row['Campaign'], 'Match': row['norm_match'],
-                                'Spend': row['Spend'], 'Sales': row['Sales'], 'CPC': row['CPC'], 'ROAS': row['ROAS'], 'Rec': rec
-                            })
-                    
-                    df_cpc = pd.DataFrame(cpc_results)
-                    for c in ['Spend', 'Sales', 'CPC', 'ROAS']: df_cpc[c] = df_cpc[c].round(1)
-                    
-                    def highlight_high_cpc(row):
-                        if 'High CPC' in row['Rec'] or 'Low ROAS' in row['Rec']: return ['color: #d32f2f; font-weight: bold'] * len(row)
-                        return [''] * len(row)
-                    st.dataframe(df_cpc.style.apply(highlight_high_cpc, axis=1).format({'CPC': '{:.1f}', 'ROAS': '{:.1f}', 'Spend': '{:.1f}', 'Sales': '{:.1f}'}), use_container_width=True)
-
-                # TAB 4: BEST DAYS
-                with tabs[3]:
-                    st.subheader("📅 Day Parting Performance")
-                    if col_map['date']:
-                        day_agg = df.groupby(df['Date'].dt.day_name()).agg({col_map['spend']: 'sum', col_map['sales']: 'sum', col_map['orders']: 'sum'}).reindex(['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'])
-                        day_agg['ROAS'] = day_agg.apply(lambda x: x[col_map['sales']]/x[col_map['spend']] if x[col_map['spend']]>0 else 0, axis=1)
-                        day_agg['ACOS'] = day_agg.apply(lambda x: (x[col_map['spend']]/x[col_map['sales']])*100 if x[col_map['sales']]>0 else 0, axis=1)
-                        
-                        day_display = day_agg.rename(columns={col_map['spend']: 'Spend', col_map['sales']: 'Sales', col_map['orders']: 'Orders'})
-                        for c in ['Spend', 'Sales', 'ROAS', 'ACOS']: day_display[c] = day_display[c].round(1)
-
-                        c1, c2 = st.columns(2)
-                        with c1: st.markdown("##### 📉 Spend Trend"); st.bar_chart(day_display['Spend'], color="#ff4b4b")
-                        with c2: st.markdown("##### 📦 Order Volume"); st.bar_chart(day_display['Orders'], color="#00C0F2")
-                        st.markdown("##### Daily Breakdown"); st.dataframe(day_display[['Spend', 'Sales', 'Orders', 'ROAS', 'ACOS']].style.format("{:.1f}"), use_container_width=True)
-                    else:
-                        st.warning("No 'Date' column found.")
-                        day_display = pd.DataFrame()
-
-                # TAB 5: WASTED SPEND
-                with tabs[4]:
-                    st.subheader("💸 Wasted Spend (Zero Orders)")
-                    waste_threshold = st.slider("Min Spend Threshold", 50, 1000, 200)
-                    df_waste = df_agg[(df_agg['Orders'] == 0) & (df_agg['Spend'] >= waste_threshold)].sort_values(by='Spend', ascending=False)
-                    for c in ['Spend', 'CPC', 'ACOS']: df_waste[c] = df_waste[c].round(1)
-                    st.dataframe(df_waste[['Search Term', 'Campaign', 'Ad Group', 'Spend', 'Orders', 'ACOS', 'Clicks', 'CPC']].style.format({'Spend': '{:.1f}', 'CPC': '{:.1f}', 'ACOS': '{:.1f}'}), use_container_width=True)
-
-                # TAB 6: N-GRAMS
-                with tabs[5]:
-                    st.subheader("🔠 N-Gram Analyzer")
-                    col_control1, col_control2 = st.columns([1, 3])
-                    with col_control1: n_select = st.radio("Select Phrase Size (N)", [1, 2, 3, 4], horizontal=True, index=0)
-                    with col_control2: search_gram = st.text_input("🔍 Filter by word (e.g., 'leather')", "")
-                    
-                    df_ngram = process_ngrams(df_agg, n_select)
-                    if not df_ngram.empty:
-                        for c in ['Spend', 'Sales', 'ROAS', 'CPC', 'ACOS']: df_ngram[c] = df_ngram[c].round(1)
-                        if search_gram: df_ngram = df_ngram[df_ngram['N-Gram'].str.contains(search_gram.lower())]
-                        
-                        st.markdown(f"##### Top {n_select}-Word Phrases by Spend")
-                        st.bar_chart(df_ngram.head(20).set_index('N-Gram')['Spend'], color="#ff4b4b")
-                        st.markdown("##### Detailed N-Gram Report")
-                        st.dataframe(
-                            df_ngram[['N-Gram', 'Count', 'Spend', 'Sales', 'Orders', 'ACOS', 'ROAS']].style.format({
-                                'Spend': '{:.1f}', 'Sales': '{:.1f}', 'ACOS': '{:.1f}%', 'ROAS': '{:.1f}'
-                            }), 
-                            use_container_width=True
-                        )
-                    else:
-                        st.warning("No data found.")
-
-                # EXPORT
-                st.markdown("---")
-                st.markdown("### 📥 Download Everything")
-                export_data = {
-                    'Cannibalization': df_cannibal if 'df_cannibal' in locals() else pd.DataFrame(),
-                    'Harvesting': df_harvest if 'df_harvest' in locals() else pd.DataFrame(),
-                    'CPC_Analysis': df_cpc if 'df_cpc' in locals() else pd.DataFrame(),
-                    'Wasted_Spend': df_waste if 'df_waste' in locals() else pd.DataFrame(),
-                    'Day_Performance': day_display if 'day_display' in locals() else pd.DataFrame(),
-                    'N-Gram_Analysis': df_ngram if 'df_ngram' in locals() else pd.DataFrame()
-                }
-                excel_file = to_excel(export_data)
-                st.download_button(label="📥 Download Master Report", data=excel_file, file_name="Prabal_Ecommerce_Master_Report.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-                
-        except Exception as e:
-            st.error(f"Error processing analysis: {e}")
-    else:
-        st.info("👋 Welcome! Please upload your Search Term Report to begin.")
-
-if __name__ == "__main__":
-    main()
+import streamlit as st
+import pandas as pd
+import numpy as np
+import io
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; determine_winners falls back to numpy
+    njit = None
+
+# --- PAGE CONFIGURATION ---
+st.set_page_config(
+    page_title="Prabal Ecommerce Analyzer",
+    page_icon="🛒",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# --- CUSTOM CSS ---
+st.markdown("""
+    <style>
+    .main { background-color: #f8f9fa; }
+    .stMetric { background-color: white; padding: 15px; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.05); }
+    h1, h2, h3 { color: #232f3e; font-family: 'Helvetica Neue', Helvetica, Arial, sans-serif; }
+    </style>
+    """, unsafe_allow_html=True)
+
+# --- HELPER FUNCTIONS ---
+
+def safe_divide(numer, denom, scale=1.0):
+    # Vectorized a/b with a 0 fallback: one C-level pass instead of a Python call per row
+    numer = numer.to_numpy(dtype='float64')
+    denom = denom.to_numpy(dtype='float64')
+    return np.divide(numer * scale, denom, out=np.zeros_like(numer), where=denom > 0)
+
+def normalize_match_types(col):
+    # Vectorized substring tests over the whole column instead of a Python call per row
+    s = col.astype('string').str.upper()
+    return np.select(
+        [s.isna(), s.str.contains('EXACT', na=False),
+         s.str.contains('PHRASE', na=False), s.str.contains('BROAD', na=False)],
+        ['UNKNOWN', 'EXACT', 'PHRASE', 'BROAD'],
+        default='AUTO/OTHER')
+
+REASON_LABELS = np.array(["Best Sales & ROAS", "Efficient (Better ROAS)", "Volume Leader"])
+
+def _pick_winners(sl_roas, ch_roas, ch_orders, sl_idx, ch_idx, thr, min_orders):
+    # Fused improvement + threshold + min-orders decision in one pass over
+    # the group-leader arrays; compiled to native code by numba when available
+    n = sl_roas.shape[0]
+    out_idx = np.empty(n, np.int64)
+    reason = np.empty(n, np.int64)
+    for i in range(n):
+        if sl_idx[i] == ch_idx[i]:
+            out_idx[i] = sl_idx[i]; reason[i] = 0
+            continue
+        imp = 999.0 if sl_roas[i] == 0 else (ch_roas[i] - sl_roas[i]) / sl_roas[i]
+        if imp >= thr and ch_orders[i] >= min_orders:
+            out_idx[i] = ch_idx[i]; reason[i] = 1
+        else:
+            out_idx[i] = sl_idx[i]; reason[i] = 2
+    return out_idx, reason
+
+if njit is not None:
+    _pick_winners = njit(cache=True, fastmath=True)(_pick_winners)
+
+def determine_winners(dup_df, improvement_thresh, min_orders):
+    # Two C-level group reductions across all cannibal terms at once,
+    # instead of a boolean-mask scan + idxmax pair per term
+    # observed=True: dup_df is a subset, so skip categories with no rows here
+    grp = dup_df.groupby('Search Term', observed=True)
+    sales_leader_idx = grp['Sales'].idxmax()
+    roas_leader_idx = grp['ROAS'].idxmax()
+
+    sl_roas = dup_df.loc[sales_leader_idx, 'ROAS'].to_numpy(dtype='float64')
+    ch_roas = dup_df.loc[roas_leader_idx, 'ROAS'].to_numpy(dtype='float64')
+    ch_orders = dup_df.loc[roas_leader_idx, 'Orders'].to_numpy(dtype='float64')
+    sl_idx = sales_leader_idx.to_numpy(dtype='int64')
+    ch_idx = roas_leader_idx.to_numpy(dtype='int64')
+    thr = improvement_thresh / 100.0
+
+    if njit is not None:
+        winner_idx, reason_code = _pick_winners(sl_roas, ch_roas, ch_orders,
+                                                sl_idx, ch_idx, thr, float(min_orders))
+    else:
+        improvement = np.divide(ch_roas - sl_roas, sl_roas,
+                                out=np.full(len(sl_roas), 999.0), where=sl_roas > 0)
+        challenger_wins = (improvement >= thr) & (ch_orders >= min_orders)
+        winner_idx = np.where(challenger_wins, ch_idx, sl_idx)
+        reason_code = np.select([sl_idx == ch_idx, challenger_wins], [0, 1], default=2)
+
+    return winner_idx, dict(zip(sales_leader_idx.index, REASON_LABELS[reason_code]))
+
+def generate_ngrams(text, n):
+    words = str(text).lower().split()
+    if len(words) < n:
+        return []
+    return [' '.join(words[i:i+n]) for i in range(len(words)-n+1)]
+
+def process_ngrams(df, n_value):
+    ngram_data = []
+    for _, row in df.iterrows():
+        term = row['Search Term']
+        grams = generate_ngrams(term, n_value)
+        for gram in grams:
+            ngram_data.append({
+                'N-Gram': gram,
+                'Spend': row['Spend'],
+                'Sales': row['Sales'],
+                'Orders': row['Orders'],
+                'Clicks': row['Clicks']
+            })
+
+    if not ngram_data:
+        return pd.DataFrame()
+
+    ng_df = pd.DataFrame(ngram_data)
+    ng_agg = ng_df.groupby('N-Gram', as_index=False).sum()
+
+    # Calculate Metrics
+    ng_agg['ROAS'] = safe_divide(ng_agg['Sales'], ng_agg['Spend'])
+    ng_agg['CPC'] = safe_divide(ng_agg['Spend'], ng_agg['Clicks'])
+    ng_agg['ACOS'] = safe_divide(ng_agg['Spend'], ng_agg['Sales'], scale=100)
+    ng_agg['Count'] = ng_df.groupby('N-Gram').size().values
+
+    return ng_agg.sort_values(by='Spend', ascending=False)
+
+@st.cache_data(show_spinner=False)
+def df_to_csv_bytes(df):
+    # CSV encoding is O(rows x columns) string work; cache on the frame so
+    # reruns only pay it when the results actually change
+    return df.to_csv(index=False).encode('utf-8')
+
+@st.cache_data(show_spinner=False)
+def to_excel(dfs):
+    # Serializing the workbook is O(rows) Python-string work; cache on the
+    # frames so reruns that leave the results untouched skip it entirely
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        for sheet_name, df in dfs.items():
+            if not df.empty:
+                df.to_excel(writer, sheet_name=sheet_name[:31], index=False)
+    return output.getvalue()
+
+# --- CACHED PIPELINE ---
+# Streamlit reruns the whole script on every widget interaction; the cache
+# keys below (file bytes + filename, portfolio selection, slider values)
+# ensure pandas IO and the groupby pipeline only run when their inputs change.
+
+@st.cache_data(show_spinner="Parsing report…", max_entries=8)
+def load_report(file_bytes, filename):
+    buf = io.BytesIO(file_bytes)
+    # Prefer Arrow's multi-threaded CSV parser and the Rust-based calamine
+    # xlsx reader; fall back to the default engines when they are missing
+    if filename.endswith('.csv'):
+        try:
+            df_raw = pd.read_csv(buf, engine='pyarrow')
+        except (ImportError, ValueError):
+            buf.seek(0)
+            df_raw = pd.read_csv(buf)
+    else:
+        try:
+            df_raw = pd.read_excel(buf, engine='calamine')
+        except (ImportError, ValueError):
+            buf.seek(0)
+            df_raw = pd.read_excel(buf)
+    df_raw.columns = df_raw.columns.str.strip()
+    return df_raw
+
+def aggregate_report(df, key_cols, sum_cols):
+    # Arrow's hash aggregation is multi-threaded and SIMD-accelerated; only
+    # the aggregated table — typically orders of magnitude smaller than the
+    # per-day rows — crosses back into pandas. The raw frame itself is still
+    # needed (portfolio filter, day parting), so only the groupby moves.
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return df.groupby(key_cols, as_index=False, observed=True, sort=False).agg(
+            **{out: (src, 'sum') for out, src in sum_cols.items()})
+
+    tbl = pa.Table.from_pandas(df[key_cols + list(sum_cols.values())], preserve_index=False)
+    agg = tbl.group_by(key_cols).aggregate([(src, 'sum') for src in sum_cols.values()])
+    df_agg = agg.to_pandas().rename(columns={f"{src}_sum": out for out, src in sum_cols.items()})
+    # pandas groupby drops null keys; Arrow keeps them as a null group
+    df_agg = df_agg.dropna(subset=key_cols)
+    return df_agg[key_cols + list(sum_cols.keys())]
+
+@st.cache_data(show_spinner="Preparing data…", max_entries=8)
+def load_and_prepare(file_bytes, filename, portfolios):
+    df = load_report(file_bytes, filename)
+    if portfolios is not None:
+        port_col, selected_ports = portfolios
+        df = df[df[port_col].isin(selected_ports)]
+    df = df.copy()
+
+    # Column Mapping — one pass over the header instead of a scan per field
+    patterns = {
+        'date': ('Date',),
+        'term': ('Matched product', 'Customer Search Term'),
+        'camp': ('Campaign Name',),
+        'adg': ('Ad Group Name',),
+        'match': ('Match Type',),
+        'orders': ('Orders', 'Units'),
+        'sales': ('Sales',),
+        'spend': ('Spend',),
+        'clicks': ('Clicks',),
+        'impressions': ('Impressions',)
+    }
+    col_map = {k: None for k in patterns}
+    for c in df.columns:
+        for k, needles in patterns.items():
+            if col_map[k] is None and any(n in c for n in needles):
+                col_map[k] = c
+                break
+
+    if any(col_map[k] is None for k in ['term', 'camp', 'adg', 'spend', 'sales']):
+        return None, None, col_map
+
+    # Cleanup Numeric — float32 for money and int32 for counts halves the
+    # bytes moved through the groupby and ratio passes; PPC report values
+    # never need 64-bit range
+    for c in ('sales', 'spend'):
+        if col_map[c]:
+            df[col_map[c]] = pd.to_numeric(df[col_map[c]], errors='coerce').fillna(0).astype('float32')
+    for c in ('orders', 'clicks', 'impressions'):
+        if col_map[c]:
+            df[col_map[c]] = pd.to_numeric(df[col_map[c]], errors='coerce').fillna(0).astype('int32')
+
+    df['norm_match'] = normalize_match_types(df[col_map['match']])
+    if col_map['date']:
+        df['Date'] = pd.to_datetime(df[col_map['date']], errors='coerce')
+        df['DayOfWeek'] = df['Date'].dt.day_name()
+
+    # --- AGGREGATION ---
+    agg_cols = [col_map['term'], col_map['camp'], col_map['adg'], 'norm_match']
+    sum_cols = {'Spend': col_map['spend'], 'Sales': col_map['sales'], 'Orders': col_map['orders'],
+                'Clicks': col_map['clicks'], 'Impressions': col_map['impressions']}
+    df_agg = aggregate_report(df, agg_cols, sum_cols)
+
+    df_agg.rename(columns={
+        col_map['term']: 'Search Term',
+        col_map['camp']: 'Campaign',
+        col_map['adg']: 'Ad Group'
+    }, inplace=True)
+
+    # Categorical keys: later groupbys, comparisons and isin run on integer
+    # codes instead of hashing Python strings per row
+    for c in ('Search Term', 'Campaign', 'Ad Group', 'norm_match'):
+        df_agg[c] = df_agg[c].astype('category')
+
+    # Lowercase each unique term once via the category table, not once per row
+    term_cat = df_agg['Search Term'].cat
+    df_agg['Term LC'] = term_cat.categories.str.lower().take(term_cat.codes)
+
+    df_agg['ROAS'] = safe_divide(df_agg['Sales'], df_agg['Spend'])
+    df_agg['CPC'] = safe_divide(df_agg['Spend'], df_agg['Clicks'])
+    df_agg['ACOS'] = safe_divide(df_agg['Spend'], df_agg['Sales'], scale=100)
+
+    # Rounding 1 Decimal
+    for col in ['Spend', 'Sales', 'ROAS', 'CPC', 'ACOS']:
+        df_agg[col] = df_agg[col].round(1)
+
+    return df, df_agg, col_map
+
+@st.cache_data(show_spinner=False)
+def compute_cannibalization(df_agg, improvement_thresh, min_orders):
+    # Read-only slices below; only the final results frame is copied for mutation
+    sales_df = df_agg[df_agg['Orders'] > 0]
+    # Single hash-table pass flags every row of a duplicated term,
+    # without materializing per-term counts or a Python list of terms
+    cannibal_mask = sales_df.duplicated(subset=['Search Term'], keep=False)
+    dup_df = sales_df[cannibal_mask]
+    cannibal_terms = dup_df['Search Term'].unique()
+
+    if len(cannibal_terms) == 0:
+        return pd.DataFrame(), 0
+    winner_idx, reason_map = determine_winners(dup_df, improvement_thresh, min_orders)
+
+    # Column-wise assembly: one slice plus two vectorized columns,
+    # instead of boxing every row into a dict
+    df_cannibal = dup_df[['Search Term', 'Campaign', 'Ad Group', 'CPC', 'Spend', 'Sales', 'Orders', 'ROAS']].copy()
+    df_cannibal['Action'] = np.where(dup_df.index.isin(winner_idx), "✅ KEEP", "⛔ NEGATE")
+    df_cannibal['Reason'] = dup_df['Search Term'].map(reason_map)
+    for c in ['Spend', 'Sales', 'ROAS', 'CPC']: df_cannibal[c] = df_cannibal[c].round(1)
+    # df_agg is no longer term-sorted; keep each term's rows adjacent in the table
+    df_cannibal = df_cannibal.sort_values(by='Search Term', kind='stable')
+    return df_cannibal.reset_index(drop=True), len(cannibal_terms)
+
+@st.cache_data(show_spinner=False)
+def compute_harvest(df_agg, min_orders, min_roas):
+    # Keyed on the pipeline output and the harvesting thresholds only, so
+    # cannibalization/CPC slider moves hit this cache instead of recomputing
+    # One equality pass shared by both sides of the exact/non-exact split,
+    # then a single fused numpy mask for the candidate filter
+    is_exact = (df_agg['norm_match'] == 'EXACT').to_numpy()
+    exact_terms = df_agg.loc[is_exact, 'Term LC'].unique()
+    candidates_mask = (~is_exact
+                       & (df_agg['Orders'].to_numpy() >= min_orders)
+                       & (df_agg['ROAS'].to_numpy() >= min_roas)
+                       & ~df_agg['Term LC'].isin(exact_terms).to_numpy())
+    new_opps = df_agg[candidates_mask]
+
+    if new_opps.empty:
+        return pd.DataFrame()
+
+    # Sort on an integer indexer first, then gather + project in one pass —
+    # no intermediate copy of the projected columns before the sort
+    order = np.argsort(-new_opps['Sales'].to_numpy(), kind='stable')
+    df_harvest = new_opps.iloc[order][['Search Term', 'Campaign', 'Ad Group', 'Orders', 'Sales', 'ROAS', 'CPC']].rename(
+        columns={'Campaign': 'Source Campaign', 'Ad Group': 'Source Ad Group'})
+    df_harvest.insert(1, 'Rec Type', '🚀 NEW EXACT')
+    return df_harvest
+
+# --- MAIN APP ---
+
+def main():
+    with st.sidebar:
+        st.title("🛒 Prabal Ecommerce Analyzer")
+        st.markdown("---")
+
+        # 1. File Upload
+        st.subheader("1. Data Source")
+        uploaded_file = st.file_uploader("Upload Search Term Report", type=["csv", "xlsx"])
+
+        file_ready = False
+        portfolios = None
+        file_bytes = None
+
+        # 2. Portfolio Filter
+        if uploaded_file:
+            try:
+                # Snapshot the upload once; reruns can reset the underlying
+                # buffer, and every parser below works from these bytes
+                file_bytes = uploaded_file.getvalue()
+                df_raw = load_report(file_bytes, uploaded_file.name)
+                file_ready = True
+
+                port_col = next((c for c in df_raw.columns if 'Portfolio' in c), None)
+
+                if port_col:
+                    st.subheader("2. Filter Data")
+                    all_portfolios = df_raw[port_col].dropna().unique().tolist()
+                    selected_ports = st.multiselect("Select Portfolios", options=all_portfolios, default=all_portfolios)
+
+                    if selected_ports:
+                        portfolios = (port_col, tuple(selected_ports))
+                else:
+                    st.info("No 'Portfolio' column found. Showing all data.")
+
+            except Exception as e:
+                st.error(f"Error reading file: {e}")
+                file_ready = False
+
+        # 3. Settings
+        if file_ready:
+            st.markdown("---")
+            st.subheader("3. Analysis Thresholds")
+
+            with st.expander("⚔️ Cannibalization Rules", expanded=False):
+                roas_threshold = st.slider("Better ROAS Threshold (%)", 30, 200, 100, 10)
+                min_orders_cannibal = st.number_input("Min Orders to Win", 1, 10, 2)
+
+            with st.expander("🌾 Harvesting Rules", expanded=True):
+                min_orders_harvest = st.number_input("Min Orders", 1, 10, 2, help="Strictly > 1 means set this to 2")
+                min_roas_harvest = st.number_input("Min ROAS", 0.1, 10.0, 1.0, 0.1)
+
+            with st.expander("💰 CPC Analyzer", expanded=False):
+                top_n_terms = st.slider("Analyze Top N Terms", 10, 100, 50)
+                bad_roas_limit = st.number_input("Low ROAS Flag (<)", 0.1, 5.0, 1.0, 0.1)
+
+    # --- MAIN CONTENT ---
+    if file_ready:
+        try:
+            df, df_agg, col_map = load_and_prepare(file_bytes, uploaded_file.name, portfolios)
+
+            if df_agg is None:
+                st.error(f"Missing essential columns. Please check your file headers. Found: {col_map}")
+            else:
+                # --- HEADER ---
+                st.title("Prabal Ecommerce Analyzer")
+                st.markdown(f"**Analyzing File:** `{uploaded_file.name}`")
+
+                c1, c2, c3, c4 = st.columns(4)
+                c1.metric("Total Spend", f"₹{df_agg['Spend'].sum():,.1f}")
+                c2.metric("Total Sales", f"₹{df_agg['Sales'].sum():,.1f}")
+
+                total_spend = df_agg['Spend'].sum()
+                total_sales = df_agg['Sales'].sum()
+                account_roas = total_sales / total_spend if total_spend > 0 else 0
+                c3.metric("Account ROAS", f"{account_roas:.1f}")
+                # The categories were built from df_agg itself, so their count
+                # is the unique-term count — an O(1) metadata read vs nunique's
+                # full hash pass
+                c4.metric("Unique Search Terms", f"{df_agg['Search Term'].cat.categories.size:,}")
+
+                # --- TABS ---
+                tabs = st.tabs(["⚔️ Cannibalization", "🌾 Harvesting", "💰 CPC Analyzer", "📅 Best Days", "💸 Wasted Spend", "🔠 N-Gram Analysis"])
+
+                # TAB 1: CANNIBALIZATION
+                with tabs[0]:
+                    st.subheader("Detect & Fix Self-Competition")
+                    df_cannibal, num_cannibal_terms = compute_cannibalization(df_agg, roas_threshold, min_orders_cannibal)
+
+                    st.info(f"**Common Search Terms Found:** {num_cannibal_terms} (Terms appearing in >1 Ad Group with Sales)")
+
+                    if not df_cannibal.empty:
+                        def highlight_negate(res):
+                            # One call over the whole frame: a single vectorized
+                            # contains test instead of a Python callback per row
+                            colors = pd.DataFrame('', index=res.index, columns=res.columns)
+                            colors['Action'] = np.where(res['Action'].str.contains('NEGATE'), 'background-color: #ffebee', '')
+                            return colors
+                        st.dataframe(df_cannibal.style.apply(highlight_negate, axis=None), use_container_width=True)
+                        st.download_button("📥 Download Action Plan", df_to_csv_bytes(df_cannibal), "cannibalization_fix.csv", "text/csv")
+                    else:
+                        st.success("No cannibalization found.")
+
+                # TAB 2: HARVESTING
+                with tabs[1]:
+                    st.subheader("Strict Growth Opportunities")
+                    st.caption(f"Criteria: Orders >= {min_orders_harvest} AND ROAS >= {min_roas_harvest}")
+                    df_harvest = compute_harvest(df_agg, min_orders_harvest, min_roas_harvest)
+
+                    if not df_harvest.empty:
+                        st.dataframe(df_harvest, use_container_width=True)
+                        st.download_button("📥 Download Harvest List", df_to_csv_bytes(df_harvest), "harvest_terms.csv", "text/csv")
+                    else:
+                        st.info("No terms met criteria.")
+
+                # TAB 3: CPC ANALYZER
+                with tabs[2]:
+                    st.subheader(f"Top {top_n_terms} Terms: CPC & Performance")
+                    top_terms = df_agg.groupby('Search Term', observed=True)['Spend'].sum().nlargest(top_n_terms).index.tolist()
+                    df_top = df_agg[df_agg['Search Term'].isin(top_terms)]
+
+                    # Column-wise assembly from already-typed arrays: no dict
+                    # per row and no dtype inference pass over the result
+                    avg_cpc = df_top.groupby('Search Term', observed=True)['CPC'].transform('mean')
+                    rec = np.select(
+                        [df_top['ROAS'].to_numpy() < bad_roas_limit,
+                         df_top['CPC'].to_numpy() > avg_cpc.to_numpy() * 1.3],
+                        ["⚠️ Low ROAS", "⚠️ High CPC"],
+                        default="✅ Healthy")
+                    df_cpc = pd.DataFrame({
+                        'Search Term': df_top['Search Term'].to_numpy(),
+                        'Campaign': df_top['Campaign'].to_numpy(),
+                        'Match': df_top['norm_match'].to_numpy(),
+                        'Spend': df_top['Spend'].to_numpy(),
+                        'Sales': df_top['Sales'].to_numpy(),
+                        'CPC': df_top['CPC'].to_numpy(),
+                        'ROAS': df_top['ROAS'].to_numpy(),
+                        'Rec': rec
+                    })
+                    # Keep the old presentation order: terms by spend rank
+                    term_rank = {t: i for i, t in enumerate(top_terms)}
+                    df_cpc = df_cpc.iloc[np.argsort(df_cpc['Search Term'].map(term_rank).to_numpy(), kind='stable')].reset_index(drop=True)
+                    for c in ['Spend', 'Sales', 'CPC', 'ROAS']: df_cpc[c] = df_cpc[c].round(1)
+
+                    def highlight_high_cpc(res):
+                        # Whole-row red for flagged terms, broadcast from one vectorized mask
+                        flagged = res['Rec'].str.contains('High CPC|Low ROAS').to_numpy()
+                        colors = np.where(flagged[:, None], 'color: #d32f2f; font-weight: bold', '')
+                        return pd.DataFrame(np.broadcast_to(colors, res.shape), index=res.index, columns=res.columns)
+                    st.dataframe(df_cpc.style.apply(highlight_high_cpc, axis=None).format({'CPC': '{:.1f}', 'ROAS': '{:.1f}', 'Spend': '{:.1f}', 'Sales': '{:.1f}'}), use_container_width=True)
+
+                # TAB 4: BEST DAYS
+                with tabs[3]:
+                    st.subheader("📅 Day Parting Performance")
+                    if col_map['date']:
+                        day_agg = df.groupby(df['Date'].dt.day_name()).agg({col_map['spend']: 'sum', col_map['sales']: 'sum', col_map['orders']: 'sum'}).reindex(['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'])
+                        day_agg['ROAS'] = safe_divide(day_agg[col_map['sales']], day_agg[col_map['spend']])
+                        day_agg['ACOS'] = safe_divide(day_agg[col_map['spend']], day_agg[col_map['sales']], scale=100)
+
+                        day_display = day_agg.rename(columns={col_map['spend']: 'Spend', col_map['sales']: 'Sales', col_map['orders']: 'Orders'})
+                        for c in ['Spend', 'Sales', 'ROAS', 'ACOS']: day_display[c] = day_display[c].round(1)
+
+                        c1, c2 = st.columns(2)
+                        with c1: st.markdown("##### 📉 Spend Trend"); st.bar_chart(day_display['Spend'], color="#ff4b4b")
+                        with c2: st.markdown("##### 📦 Order Volume"); st.bar_chart(day_display['Orders'], color="#00C0F2")
+                        st.markdown("##### Daily Breakdown"); st.dataframe(day_display[['Spend', 'Sales', 'Orders', 'ROAS', 'ACOS']].style.format("{:.1f}"), use_container_width=True)
+                    else:
+                        st.warning("No 'Date' column found.")
+                        day_display = pd.DataFrame()
+
+                # TAB 5: WASTED SPEND
+                with tabs[4]:
+                    st.subheader("💸 Wasted Spend (Zero Orders)")
+                    waste_threshold = st.slider("Min Spend Threshold", 50, 1000, 200)
+                    df_waste = df_agg[(df_agg['Orders'] == 0) & (df_agg['Spend'] >= waste_threshold)].sort_values(by='Spend', ascending=False)
+                    for c in ['Spend', 'CPC', 'ACOS']: df_waste[c] = df_waste[c].round(1)
+                    st.dataframe(df_waste[['Search Term', 'Campaign', 'Ad Group', 'Spend', 'Orders', 'ACOS', 'Clicks', 'CPC']].style.format({'Spend': '{:.1f}', 'CPC': '{:.1f}', 'ACOS': '{:.1f}'}), use_container_width=True)
+
+                # TAB 6: N-GRAMS
+                with tabs[5]:
+                    st.subheader("🔠 N-Gram Analyzer")
+                    col_control1, col_control2 = st.columns([1, 3])
+                    with col_control1: n_select = st.radio("Select Phrase Size (N)", [1, 2, 3, 4], horizontal=True, index=0)
+                    with col_control2: search_gram = st.text_input("🔍 Filter by word (e.g., 'leather')", "")
+
+                    df_ngram = process_ngrams(df_agg, n_select)
+                    if not df_ngram.empty:
+                        for c in ['Spend', 'Sales', 'ROAS', 'CPC', 'ACOS']: df_ngram[c] = df_ngram[c].round(1)
+                        if search_gram: df_ngram = df_ngram[df_ngram['N-Gram'].str.contains(search_gram.lower())]
+
+                        st.markdown(f"##### Top {n_select}-Word Phrases by Spend")
+                        st.bar_chart(df_ngram.head(20).set_index('N-Gram')['Spend'], color="#ff4b4b")
+                        st.markdown("##### Detailed N-Gram Report")
+                        st.dataframe(
+                            df_ngram[['N-Gram', 'Count', 'Spend', 'Sales', 'Orders', 'ACOS', 'ROAS']].style.format({
+                                'Spend': '{:.1f}', 'Sales': '{:.1f}', 'ACOS': '{:.1f}%', 'ROAS': '{:.1f}'
+                            }),
+                            use_container_width=True
+                        )
+                    else:
+                        st.warning("No data found.")
+
+                # EXPORT
+                st.markdown("---")
+                st.markdown("### 📥 Download Everything")
+                export_data = {
+                    'Cannibalization': df_cannibal if 'df_cannibal' in locals() else pd.DataFrame(),
+                    'Harvesting': df_harvest if 'df_harvest' in locals() else pd.DataFrame(),
+                    'CPC_Analysis': df_cpc if 'df_cpc' in locals() else pd.DataFrame(),
+                    'Wasted_Spend': df_waste if 'df_waste' in locals() else pd.DataFrame(),
+                    'Day_Performance': day_display if 'day_display' in locals() else pd.DataFrame(),
+                    'N-Gram_Analysis': df_ngram if 'df_ngram' in locals() else pd.DataFrame()
+                }
+                excel_file = to_excel(export_data)
+                st.download_button(label="📥 Download Master Report", data=excel_file, file_name="Prabal_Ecommerce_Master_Report.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+        except Exception as e:
+            st.error(f"Error processing analysis: {e}")
+    else:
+        st.info("👋 Welcome! Please upload your Search Term Report to begin.")
+
+if __name__ == "__main__":
+    main()